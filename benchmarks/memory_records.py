@@ -0,0 +1,79 @@
+"""
+Memory benchmark: plain crawl_url() dicts vs records.PageStore.
+
+    python benchmarks/memory_records.py [pages ...]
+
+Builds synthetic pages shaped like crawl_url() output (images, internal
+links, 3000 chars of text) and measures retained memory with tracemalloc.
+
+The reduction grows with crawl size. Every distinct link target costs
+PageStore one node entry, and the synthetic links point at ~50k random
+pages: small crawls mostly add new nodes, large ones mostly reuse them.
+Run several sizes (the default) rather than quoting a single ratio.
+"""
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from records import PageStore
+
+HOST = "https://www.example-client.com"
+
+def fake_page(i, rng):
+    # Looks like a crawl_url() result for a page deep inside one site
+    section = rng.choice(["blog", "products", "docs", "news", "help"])
+    return f"{HOST}/{section}/item-{i}", {
+        "status_code": rng.choice([200] * 9 + [404]),
+        "load_time": round(rng.uniform(0.1, 3.0), 2),
+        "title": f"Item {i} | Example Client",
+        "meta_desc": rng.choice(["Missing", f"Everything about item {i} and more."]),
+        "images": [{"src": f"{HOST}/assets/img/{rng.randint(0, 5000)}.png",
+                    "alt": rng.choice(["", "Product photo", "Team meeting"])}
+                   for _ in range(10)],
+        "internal_links_count": 40,
+        "found_links": [f"{HOST}/{rng.choice(['blog', 'products', 'docs'])}/item-{rng.randint(0, 50000)}"
+                        for _ in range(40)],
+        "page_text": "".join(rng.choices(string.ascii_letters + " ", k=3000)),
+        "security_headers": {"hsts": True, "x_frame": False, "x_content_type": True, "csp": False},
+    }
+
+def measure(build):
+    tracemalloc.start()
+    start = time.time()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, time.time() - start
+
+def main(pages):
+    def as_dicts():
+        rng = random.Random(42)
+        return [fake_page(i, rng) for i in range(pages)]
+
+    def as_store():
+        rng = random.Random(42)
+        store = PageStore()
+        for i in range(pages):
+            store.append(*fake_page(i, rng))
+        return store
+
+    dicts, dict_bytes, dict_secs = measure(as_dicts)
+    store, store_bytes, store_secs = measure(as_store)
+
+    # Sanity check: the view must look exactly like the original dict
+    assert store[7].to_dict() == dicts[7][1]
+
+    mb = 1024 * 1024
+    print(f"pages: {pages}  (distinct URLs: {store.node_count()})")
+    print(f"  list of dicts : {dict_bytes / mb:8.1f} MB  ({dict_bytes / pages:,.0f} B/page, build {dict_secs:.1f}s)")
+    print(f"  PageStore     : {store_bytes / mb:8.1f} MB  ({store_bytes / pages:,.0f} B/page, build {store_secs:.1f}s)")
+    print(f"  reduction     : {dict_bytes / store_bytes:8.1f}x  (page text spilled to disk: {store._text_end / mb:.1f} MB)")
+    store.close()
+
+if __name__ == "__main__":
+    for size in [int(arg) for arg in sys.argv[1:]] or [1000, 3000, 10000]:
+        main(size)
@@ -8,10 +8,10 @@ import streamlit.components.v1 as components
 import datetime
 
 # --- IMPORT MODULES ---
-from crawler import crawl_url
 from utils import generate_ai_caption, generate_seo_action_plan
 import database as db 
 import report_gen # <--- NEW: Import the Report Generator
+import jobs # Background audit runner (survives reruns)
 
 # --- 1. CONFIGURATION ---
 st.set_page_config(
@@ -171,11 +171,16 @@ def generate_knowledge_graph(root_url, links):
         return f"<div>Error generating graph: {e}</div>"
 
 
+HISTORY_PAGE_SIZE = 10
+SEARCH_RESULTS = 10
+
 # --- 4. APP STATE ---
 if "audit_data" not in st.session_state:
     st.session_state.audit_data = None
     st.session_state.app_state = "landing"
     st.session_state.action_plan = None
+    st.session_state.job_id = None
+    st.session_state.scan_id = None
 
 # --- 5. SIDEBAR ---
 with st.sidebar:
@@ -190,9 +195,36 @@ with st.sidebar:
     )
     st.markdown("---")
     
+    # --- SEARCH MODULE ---
+    st.markdown("##### ⌕   Search Audits")
+    search_query = st.text_input("Search URLs, titles & page content", "", key="search_query")
+    if search_query:
+        hits = db.search_pages(search_query, limit=SEARCH_RESULTS)
+        if hits:
+            for i, hit in enumerate(hits):
+                st.markdown(f"**{hit['title'] or hit['url']}**  \n`{hit['url']}` · {hit['timestamp'][:10]}")
+                if hit['snippet']:
+                    st.caption(hit['snippet'])
+                if st.button("🗀 Open Page", key=f"search_hit_{i}"):
+                    loaded_data = db.get_scan_page(hit['scan_id'], hit['url'])
+                    if loaded_data:
+                        st.session_state.audit_data = loaded_data
+                        st.session_state.scan_id = hit['scan_id']
+                        st.session_state.app_state = "results"
+                        st.rerun()
+        else:
+            st.caption("No matching pages.")
+
+    st.markdown("---")
+
     # --- HISTORY MODULE ---
     st.markdown("##### ◴   Recent Audits")
-    history = db.get_recent_scans()
+    total_scans = db.count_scans()
+    history_pages = max(1, (total_scans + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE)
+    history_page = 1
+    if history_pages > 1:
+        history_page = st.number_input(f"Page (of {history_pages})", min_value=1, max_value=history_pages, value=1, step=1)
+    history = db.get_scans_page(history_page, HISTORY_PAGE_SIZE)
     if history:
         options = {f"{row[3][:10]} - {row[1]} ({row[2]}%)": row[0] for row in history}
         selected_option = st.selectbox("Load History:", ["Select..."] + list(options.keys()))
@@ -203,6 +235,7 @@ with st.sidebar:
                 loaded_data = db.get_scan_by_id(scan_id)
                 if loaded_data:
                     st.session_state.audit_data = loaded_data
+                    st.session_state.scan_id = scan_id
                     st.session_state.app_state = "results"
                     st.rerun()
     else:
@@ -213,34 +246,19 @@ with st.sidebar:
     target_url = st.text_input("☍ ENTER TARGET URL", "")
     
     c1, c2 = st.columns(2)
-    with c1: st.toggle("Deep Scan", value=True)
+    with c1: deep_scan = st.toggle("Deep Scan", value=True)
     with c2: st.toggle("AI Vision", value=True)
 
     st.markdown("###")
     run_btn = st.button("INITIALIZE AUDIT")
     
     if run_btn and target_url:
-        st.session_state.app_state = "results"
+        # --- CRAWL EXECUTION (BACKGROUND) ---
+        # The job keeps running across reruns; the main view polls its progress.
+        st.session_state.job_id = jobs.submit_audit(target_url, deep_scan, score_fn=calculate_score)
+        st.session_state.app_state = "running"
         st.session_state.action_plan = None
-        with st.status("System Active: Running Protocols...", expanded=True) as status:
-            st.write("» Resolving DNS & Handshake...")
-            time.sleep(0.3)
-            st.write(f"» Crawling {target_url}...")
-            
-            # --- CRAWL EXECUTION ---
-            data = crawl_url(target_url) 
-            st.session_state.audit_data = data
-            
-            # --- SAVE TO DB (AUTO) ---
-            if not data.get("error"):
-                st.write("» Saving to Knowledge Base...")
-                final_score = calculate_score(data)
-                db.save_scan(target_url, final_score, data)
-                
-            st.write("» Generating Knowledge Graph...")
-            st.write("» AI Vision Processing...")
-            time.sleep(0.3)
-            status.update(label="Audit Complete", state="complete", expanded=False)
+        st.session_state.scan_id = None
 
 # --- 6. MAIN CONTENT ---
 
@@ -265,6 +283,35 @@ if st.session_state.app_state == "landing":
             </div>
             """, unsafe_allow_html=True)
 
+# AUDIT IN PROGRESS
+elif st.session_state.app_state == "running":
+    job = jobs.get_job(st.session_state.job_id) if st.session_state.job_id else None
+
+    if job is None:
+        st.session_state.app_state = "landing"
+        st.rerun()
+    elif job["status"] in ("queued", "running"):
+        prog = job["progress"]
+        total = prog["fetched"] + prog["queued"] + prog["errors"]
+        st.markdown(f"### Auditing `{job['url']}`")
+        st.progress(prog["fetched"] / total if total else 0.0,
+                    text="Queued..." if job["status"] == "queued" else "System Active: Crawling...")
+
+        p1, p2, p3, p4 = st.columns(4)
+        p1.metric("Pages Fetched", prog["fetched"])
+        p2.metric("In Queue", prog["queued"])
+        p3.metric("Errors", prog["errors"])
+        p4.metric("ETA", f"{prog['eta']}s" if prog["eta"] is not None else "--")
+
+        # Poll again shortly; the crawl itself runs in the background pool
+        time.sleep(1)
+        st.rerun()
+    else:
+        st.session_state.audit_data = job["result"]
+        st.session_state.scan_id = job["scan_id"]
+        st.session_state.app_state = "results"
+        st.rerun()
+
 # RESULTS DASHBOARD
 elif st.session_state.app_state == "results" and st.session_state.audit_data:
     data = st.session_state.audit_data
@@ -298,16 +345,41 @@ elif st.session_state.app_state == "results" and st.session_state.audit_data:
 
             # --- NEW: PDF DOWNLOAD BUTTON ---
             st.markdown("###") # Spacer
-            if st.button("Generate PDF Report"):
-                with st.spinner("Compiling PDF..."):
-                    pdf_bytes = report_gen.create_pdf(target_url, data, final_score, st.session_state.action_plan)
-                    st.download_button(
-                        label="⬇️ Download Now",
-                        data=pdf_bytes,
-                        file_name=f"Audit_{int(time.time())}.pdf",
-                        mime="application/pdf",
-                        use_container_width=True
-                    )
+            scan_id = st.session_state.scan_id
+            if scan_id is None:
+                # Unsaved audit: fall back to the single-page report
+                if st.button("Generate PDF Report"):
+                    with st.spinner("Compiling PDF..."):
+                        pdf_bytes = report_gen.create_pdf(target_url, data, final_score, st.session_state.action_plan)
+                        st.download_button(
+                            label="⬇️ Download Now",
+                            data=pdf_bytes,
+                            file_name=f"Audit_{int(time.time())}.pdf",
+                            mime="application/pdf",
+                            use_container_width=True
+                        )
+            else:
+                # Site-wide report, built in a worker process and cached per scan
+                report_status, report_info = report_gen.get_report_status(scan_id, st.session_state.action_plan)
+                if report_status == "ready":
+                    with open(report_info, "rb") as f:
+                        st.download_button(
+                            label="⬇️ Download PDF Report",
+                            data=f.read(),
+                            file_name=f"Audit_{scan_id}.pdf",
+                            mime="application/pdf",
+                            use_container_width=True
+                        )
+                elif report_status == "running":
+                    st.info("Compiling PDF in the background...")
+                    time.sleep(1)
+                    st.rerun()
+                else:
+                    if report_status == "error":
+                        st.error(f"Report failed: {report_info}")
+                    if st.button("Generate PDF Report"):
+                        report_gen.submit_report(scan_id, st.session_state.action_plan)
+                        st.rerun()
             
         with col_stats:
             r1c1, r1c2, r1c3 = st.columns(3)
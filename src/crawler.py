@@ -2,10 +2,20 @@ import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import time
+import os
+import uuid
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+import database as db
+from politeness import HostScheduler, THROTTLE_CODES
 
-def crawl_url(url):
+def crawl_url(url, link_limit=30, scheduler=None, keep_alive=None):
     
     # Crawls the URL and extracts technical SEO data + Internal Links for the Graph.
+    # link_limit caps found_links for the graph view; pass None to keep them all (frontier crawls).
+    # scheduler (politeness.HostScheduler) throttles requests per host and picks the timeout.
+    # keep_alive runs while the scheduler makes us wait and right before the request;
+    # returning False skips the request.
     
     start_time = time.time()
     
@@ -15,7 +25,19 @@ def crawl_url(url):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=5)
+        if scheduler is None:
+            response = requests.get(url, headers=headers, timeout=5)
+        else:
+            if not scheduler.acquire(url, keep_alive=keep_alive):
+                return {"error": "Fetch skipped"}
+            start_time = time.time() # Don't count time spent waiting for a slot
+            try:
+                response = requests.get(url, headers=headers, timeout=scheduler.timeout_for(url))
+            except Exception:
+                scheduler.release(url, latency=time.time() - start_time, error=True)
+                raise
+            scheduler.release(url, response.status_code, time.time() - start_time,
+                              response.headers, len(response.content))
         soup = BeautifulSoup(response.text, 'html.parser')
         
         # 1. Basic SEO Metrics
@@ -85,10 +107,97 @@ def crawl_url(url):
             "meta_desc": meta_desc,
             "images": images,
             "internal_links_count": len(internal_links),
-            "found_links": list(internal_links)[:30],
+            "found_links": list(internal_links)[:link_limit],
             "page_text": page_text,
             "security_headers": security_headers # <--- NEW DATA POINT
         }
 
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+
+# --- RESUMABLE FRONTIER CRAWL ---
+
+def run_crawl_worker(crawl_id, worker_id=None, threads=4, batch=None, idle_wait=2.0, scheduler=None):
+    
+    # Pulls leased URLs from the shared SQLite frontier until the crawl is drained.
+    # Any number of these can run at once (threads or processes on the machine holding the DB file).
+    # Killing a worker is safe: its leases expire and another worker picks the URLs back up.
+    # Inside a worker, `threads` fetch in parallel while the HostScheduler keeps each host polite.
+    
+    db.init_db()
+    worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    scheduler = scheduler or HostScheduler()
+    # One URL per thread: a claimed URL waiting in the pool's queue would hold a
+    # lease nobody renews
+    batch = batch or threads
+    crawl = db.get_crawl(crawl_id)
+    if crawl is None:
+        raise ValueError(f"Unknown crawl id: {crawl_id}")
+
+    def process(item):
+        url, depth = item
+        lease = {"held": True}
+
+        def renew():
+            # Keeps the lease alive while the scheduler makes us wait for the host
+            lease["held"] = db.renew_lease(crawl_id, url, worker_id)
+            return lease["held"]
+
+        data = crawl_url(url, link_limit=None, scheduler=scheduler, keep_alive=renew)
+        if not lease["held"]:
+            return 0 # Another worker reclaimed the URL while we waited
+        if data.get("status_code") in THROTTLE_CODES:
+            # Throttling isn't a page failure: requeue until the host's back-off is over
+            db.requeue_url(crawl_id, url, worker_id, not_before=scheduler.next_allowed(url))
+            return 0
+        if data.get("error"):
+            db.fail_url(crawl_id, url, worker_id, error=data["error"])
+            return 0
+
+        if not db.complete_url(crawl_id, url, worker_id, depth, data):
+            return 0
+        if depth < crawl["max_depth"]:
+            db.enqueue_urls(crawl_id, data["found_links"], depth + 1)
+        return 1
+
+    fetched = 0
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            while True:
+                claimed = db.claim_urls(crawl_id, worker_id, batch)
+                if not claimed:
+                    # Other workers may still be holding leases that will add new links,
+                    # and a crashed worker's leases only become claimable once they expire
+                    progress = db.get_crawl_progress(crawl_id)
+                    if progress["pending"] + progress["leased"] == 0:
+                        break
+                    time.sleep(idle_wait)
+                    continue
+                fetched += sum(pool.map(process, claimed))
+    finally:
+        # On cancel / crash hand back anything we still hold
+        db.release_worker(crawl_id, worker_id)
+
+    return fetched
+
+def crawl_site(root_url, max_depth=1, max_pages=100, workers=4, threads=4, crawl_id=None):
+    
+    # Runs a frontier crawl with several worker processes.
+    # Pass an existing crawl_id to resume a crawl that died or was cancelled.
+    
+    db.init_db()
+    if crawl_id is None:
+        crawl_id = db.create_crawl(root_url, max_depth, max_pages)
+
+    if workers <= 1:
+        run_crawl_worker(crawl_id, threads=threads)
+    else:
+        procs = [multiprocessing.Process(target=run_crawl_worker, args=(crawl_id,), kwargs={"threads": threads})
+                 for _ in range(workers)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+    return crawl_id
@@ -1,9 +1,28 @@
 import sqlite3
 import json
 import datetime
+import time
+import re
 
 DB_NAME = "spider_history.db"
 
+# How long a worker may hold a claimed URL before another worker can reclaim it
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 2  # Seconds before a failed URL is retried, times its attempts so far
+
+# The graph view only draws a sample of each page's links
+GRAPH_LINKS = 30
+
+def _connect():
+    # Autocommit connection so we can run explicit BEGIN IMMEDIATE transactions.
+    # The busy timeout lets several worker processes share the same DB file.
+    # WAL needs shared memory, so every process must run on the same host
+    # (the DB file can't live on a network filesystem).
+    conn = sqlite3.connect(DB_NAME, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
 def init_db():
     # Creates the table if it doesn't 
     conn = sqlite3.connect(DB_NAME)
@@ -18,20 +37,143 @@ def init_db():
             full_data TEXT
         )
     ''')
+    # Older databases predate crawl jobs, so add the link column if it's missing
+    columns = [row[1] for row in c.execute("PRAGMA table_info(scans)")]
+    if "crawl_id" not in columns:
+        c.execute("ALTER TABLE scans ADD COLUMN crawl_id INTEGER")
+
+    # --- CRAWL FRONTIER ---
+    # One row per crawl job, so a crashed crawl can be resumed by its id
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS crawls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            root_url TEXT NOT NULL,
+            max_depth INTEGER DEFAULT 1,
+            max_pages INTEGER DEFAULT 100,
+            max_attempts INTEGER DEFAULT 3,
+            created DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    columns = [row[1] for row in c.execute("PRAGMA table_info(crawls)")]
+    if "max_attempts" not in columns:
+        c.execute(f"ALTER TABLE crawls ADD COLUMN max_attempts INTEGER DEFAULT {MAX_ATTEMPTS}")
+    # Pending / leased / done URLs. UNIQUE(crawl_id, url) stops double-fetching.
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS frontier (
+            crawl_id INTEGER NOT NULL,
+            url TEXT NOT NULL,
+            depth INTEGER DEFAULT 0,
+            priority INTEGER DEFAULT 0,
+            attempts INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'pending',
+            lease_owner TEXT,
+            lease_expires REAL,
+            not_before REAL,
+            last_error TEXT,
+            PRIMARY KEY (crawl_id, url)
+        )
+    ''')
+    # not_before (throttled URLs) and last_error were added after the first frontier release
+    columns = [row[1] for row in c.execute("PRAGMA table_info(frontier)")]
+    if "not_before" not in columns:
+        c.execute("ALTER TABLE frontier ADD COLUMN not_before REAL")
+    if "last_error" not in columns:
+        c.execute("ALTER TABLE frontier ADD COLUMN last_error TEXT")
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_frontier_claim
+        ON frontier (crawl_id, status, priority DESC, depth)
+    ''')
+    # Per-host politeness state shared by every worker process (see politeness.py)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS hosts (
+            host TEXT PRIMARY KEY,
+            next_allowed REAL DEFAULT 0,
+            slot_limit REAL,
+            latency REAL,
+            crawl_delay REAL,
+            throttled INTEGER DEFAULT 0,
+            robots_fetched REAL,
+            updated REAL
+        )
+    ''')
+    # robots_fetched / updated (expiry of cached host state) came later
+    columns = [row[1] for row in c.execute("PRAGMA table_info(hosts)")]
+    for column in ("robots_fetched", "updated"):
+        if column not in columns:
+            c.execute(f"ALTER TABLE hosts ADD COLUMN {column} REAL")
+    # Results of every page fetched by a crawl
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_pages (
+            crawl_id INTEGER NOT NULL,
+            url TEXT NOT NULL,
+            depth INTEGER DEFAULT 0,
+            fetched REAL,
+            full_data TEXT,
+            PRIMARY KEY (crawl_id, url)
+        )
+    ''')
+
+    conn.commit()
+
+    # --- FULL-TEXT SEARCH ---
+    # user_version tracks one-off migrations. Version 2 (re)builds the index with
+    # prefix indexes and stored BM25 weights, then indexes every existing scan.
+    # Checked inside a write transaction so parallel workers don't both rebuild it.
+    c.execute("BEGIN IMMEDIATE")
+    if c.execute("PRAGMA user_version").fetchone()[0] < 2:
+        c.execute("DROP TABLE IF EXISTS pages_fts")
+        # One row per indexed page. scan_id is stored but not tokenized.
+        # prefix='2 3' backs the "word"* prefix queries built by _fts_query.
+        c.execute('''
+            CREATE VIRTUAL TABLE pages_fts USING fts5(
+                url, title, meta_desc, page_text, scan_id UNINDEXED,
+                tokenize='porter unicode61', prefix='2 3'
+            )
+        ''')
+        # Default ranking for ORDER BY rank: title matches weigh the most
+        c.execute("INSERT INTO pages_fts(pages_fts, rank) VALUES('rank', 'bm25(2.0, 5.0, 3.0, 1.0, 0.0)')")
+        for (scan_id,) in c.execute("SELECT id FROM scans").fetchall():
+            _index_scan(c, scan_id)
+        c.execute("PRAGMA user_version = 2")
     conn.commit()
     conn.close()
 
-def save_scan(url, score, data_dict):
-    # Saves a new scan to the history
+def _index_scan(c, scan_id):
+    # Adds every page of a scan to the search index (the crawl's pages, or the stored root page)
+    c.execute("SELECT crawl_id FROM scans WHERE id=?", (scan_id,))
+    crawl_id = c.fetchone()[0]
+    if crawl_id is not None:
+        c.execute('''
+            INSERT INTO pages_fts (url, title, meta_desc, page_text, scan_id)
+            SELECT url, json_extract(full_data, '$.title'), json_extract(full_data, '$.meta_desc'),
+                   json_extract(full_data, '$.page_text'), ?
+            FROM crawl_pages WHERE crawl_id=?
+        ''', (scan_id, crawl_id))
+    else:
+        c.execute('''
+            INSERT INTO pages_fts (url, title, meta_desc, page_text, scan_id)
+            SELECT url, json_extract(full_data, '$.title'), json_extract(full_data, '$.meta_desc'),
+                   json_extract(full_data, '$.page_text'), id
+            FROM scans WHERE id=?
+        ''', (scan_id,))
+
+def save_scan(url, score, data_dict, crawl_id=None):
+    # Saves a new scan to the history and returns its id.
+    # crawl_id links the scan to every page its crawl fetched.
     conn = sqlite3.connect(DB_NAME)
     c = conn.cursor()
     # Convert the dictionary to a string so we can save it
-    data_str = json.dumps(data_dict)
+    # dict() also accepts records.PageView and other Mappings
+    data_str = json.dumps(dict(data_dict))
     
-    c.execute("INSERT INTO scans (url, score, full_data) VALUES (?, ?, ?)", 
-            (url, score, data_str))
+    c.execute("INSERT INTO scans (url, score, full_data, crawl_id) VALUES (?, ?, ?, ?)", 
+            (url, score, data_str, crawl_id))
+    scan_id = c.lastrowid
+    # Keep the search index up to date in the same transaction
+    _index_scan(c, scan_id)
     conn.commit()
     conn.close()
+    return scan_id
 
 def get_recent_scans(limit=10):
     # Fetches the last X scans for the sidebar.
@@ -42,6 +184,68 @@ def get_recent_scans(limit=10):
     conn.close()
     return rows
 
+def count_scans():
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM scans")
+    total = c.fetchone()[0]
+    conn.close()
+    return total
+
+def get_scans_page(page=1, page_size=10):
+    # Paginated history, newest first (page numbers start at 1)
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT id, url, score, timestamp FROM scans ORDER BY id DESC LIMIT ? OFFSET ?",
+            (page_size, (page - 1) * page_size))
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+def _fts_query(text):
+    # Turns free text into a safe FTS5 query: every word must match (as a prefix).
+    # Quoting each word stops user input like "AND" or "-" being read as FTS syntax.
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
+
+def search_pages(query, limit=20, offset=0):
+    # Ranked full-text search over every indexed page (title matches weigh the most)
+    fts_query = _fts_query(query)
+    if fts_query is None:
+        return []
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    # Top-k is picked inside the FTS table first; only those rows are joined to scans
+    c.execute('''
+        SELECT f.scan_id, f.url, f.title, f.snip, s.timestamp, f.rank
+        FROM (
+            SELECT scan_id, url, title, snippet(pages_fts, 3, '**', '**', '...', 12) AS snip, rank
+            FROM pages_fts
+            WHERE pages_fts MATCH ?
+            ORDER BY rank
+            LIMIT ? OFFSET ?
+        ) f
+        JOIN scans s ON s.id = f.scan_id
+        ORDER BY f.rank
+    ''', (fts_query, limit, offset))
+    rows = c.fetchall()
+    conn.close()
+    return [{"scan_id": r[0], "url": r[1], "title": r[2], "snippet": r[3], "timestamp": r[4], "rank": r[5]}
+            for r in rows]
+
+def get_scan_page(scan_id, url):
+    # Loads one page of a scan: the crawled page if the scan has a crawl, else the stored root page
+    meta = get_scan_meta(scan_id)
+    if meta is None:
+        return None
+    if meta["crawl_id"] is not None:
+        data = get_crawl_page(meta["crawl_id"], url, link_limit=GRAPH_LINKS)
+        if data is not None:
+            return data
+    return get_scan_by_id(scan_id)
+
 def get_scan_by_id(scan_id):
     #Loads a specific old report
     conn = sqlite3.connect(DB_NAME)
@@ -51,4 +255,247 @@ def get_scan_by_id(scan_id):
     conn.close()
     if row:
         return json.loads(row[0]) # Convert string back to Python Dictionary
-    return None
\ No newline at end of file
+    return None
+
+def get_scan_meta(scan_id):
+    # Scan summary without the JSON blob (used by the report builder)
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT id, url, score, timestamp, crawl_id FROM scans WHERE id=?", (scan_id,))
+    row = c.fetchone()
+    conn.close()
+    if row:
+        return {"id": row[0], "url": row[1], "score": row[2], "timestamp": row[3], "crawl_id": row[4]}
+    return None
+
+# --- CRAWL FRONTIER API ---
+
+def create_crawl(root_url, max_depth=1, max_pages=100, max_attempts=MAX_ATTEMPTS):
+    # Registers a new crawl and seeds the frontier with the root URL.
+    # max_attempts is how often a URL is tried before it's marked failed.
+    conn = _connect()
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    c.execute("INSERT INTO crawls (root_url, max_depth, max_pages, max_attempts) VALUES (?, ?, ?, ?)",
+            (root_url, max_depth, max_pages, max_attempts))
+    crawl_id = c.lastrowid
+    c.execute("INSERT INTO frontier (crawl_id, url, depth, priority) VALUES (?, ?, 0, 0)",
+            (crawl_id, root_url))
+    c.execute("COMMIT")
+    conn.close()
+    return crawl_id
+
+def get_crawl(crawl_id):
+    conn = _connect()
+    c = conn.cursor()
+    c.execute("SELECT id, root_url, max_depth, max_pages, max_attempts, created FROM crawls WHERE id=?", (crawl_id,))
+    row = c.fetchone()
+    conn.close()
+    if row:
+        return {"id": row[0], "root_url": row[1], "max_depth": row[2],
+                "max_pages": row[3], "max_attempts": row[4], "created": row[5]}
+    return None
+
+def enqueue_urls(crawl_id, urls, depth, priority=0):
+    # Adds newly discovered URLs. Already known URLs are ignored, and we stop
+    # growing the frontier once it reaches the crawl's page budget.
+    conn = _connect()
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    c.execute("SELECT max_pages FROM crawls WHERE id=?", (crawl_id,))
+    max_pages = c.fetchone()[0]
+    c.execute("SELECT COUNT(*) FROM frontier WHERE crawl_id=?", (crawl_id,))
+    room = max_pages - c.fetchone()[0]
+    added = 0
+    for url in urls:
+        if added >= room:
+            break
+        c.execute("INSERT OR IGNORE INTO frontier (crawl_id, url, depth, priority) VALUES (?, ?, ?, ?)",
+                (crawl_id, url, depth, priority))
+        added += c.rowcount
+    c.execute("COMMIT")
+    conn.close()
+    return added
+
+def claim_urls(crawl_id, worker_id, batch=1, lease_seconds=LEASE_SECONDS):
+    # Leases up to `batch` URLs to a worker. Pending URLs and URLs whose lease
+    # has expired (crashed / cancelled worker) are both up for grabs.
+    now = time.time()
+    conn = _connect()
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    # A URL whose lease keeps expiring is probably crashing its workers; stop retrying it
+    c.execute('''
+        UPDATE frontier SET status='failed', lease_owner=NULL, lease_expires=NULL,
+            last_error='Lease expired on every attempt'
+        WHERE crawl_id=? AND status='leased' AND lease_expires < ?
+          AND attempts >= (SELECT max_attempts FROM crawls WHERE id=?)
+    ''', (crawl_id, now, crawl_id))
+    c.execute('''
+        SELECT url, depth FROM frontier
+        WHERE crawl_id=?
+          AND ((status='pending' AND (not_before IS NULL OR not_before <= ?))
+               OR (status='leased' AND lease_expires < ?))
+        ORDER BY priority DESC, depth, rowid
+        LIMIT ?
+    ''', (crawl_id, now, now, batch))
+    rows = c.fetchall()
+    c.executemany('''
+        UPDATE frontier SET status='leased', lease_owner=?, lease_expires=?, attempts=attempts+1
+        WHERE crawl_id=? AND url=?
+    ''', [(worker_id, now + lease_seconds, crawl_id, url) for url, _ in rows])
+    c.execute("COMMIT")
+    conn.close()
+    return rows
+
+def renew_lease(crawl_id, url, worker_id, lease_seconds=LEASE_SECONDS):
+    # Extends a lease for slow fetches. Returns False if the lease was lost.
+    conn = _connect()
+    c = conn.cursor()
+    c.execute("UPDATE frontier SET lease_expires=? WHERE crawl_id=? AND url=? AND lease_owner=? AND status='leased'",
+            (time.time() + lease_seconds, crawl_id, url, worker_id))
+    renewed = c.rowcount == 1
+    conn.close()
+    return renewed
+
+def complete_url(crawl_id, url, worker_id, depth, data_dict):
+    # Stores the page result and marks the URL done, but only if this worker
+    # still holds the lease (otherwise someone else reclaimed it).
+    conn = _connect()
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    c.execute("UPDATE frontier SET status='done', lease_owner=NULL, lease_expires=NULL WHERE crawl_id=? AND url=? AND lease_owner=?",
+            (crawl_id, url, worker_id))
+    owned = c.rowcount == 1
+    if owned:
+        c.execute("INSERT OR REPLACE INTO crawl_pages (crawl_id, url, depth, fetched, full_data) VALUES (?, ?, ?, ?, ?)",
+                (crawl_id, url, depth, time.time(), json.dumps(dict(data_dict))))
+    c.execute("COMMIT")
+    conn.close()
+    return owned
+
+def fail_url(crawl_id, url, worker_id, error=None, retry_delay=RETRY_DELAY):
+    # Puts the URL back in the queue after a growing delay, or gives up once it
+    # has used the crawl's max_attempts. The error is kept for get_url_state().
+    conn = _connect()
+    c = conn.cursor()
+    c.execute('''
+        UPDATE frontier
+        SET status=CASE WHEN attempts >= (SELECT max_attempts FROM crawls WHERE id=?)
+                        THEN 'failed' ELSE 'pending' END,
+            not_before=? + ? * attempts,
+            last_error=?, lease_owner=NULL, lease_expires=NULL
+        WHERE crawl_id=? AND url=? AND lease_owner=?
+    ''', (crawl_id, time.time(), retry_delay, error, crawl_id, url, worker_id))
+    conn.close()
+
+def requeue_url(crawl_id, url, worker_id, not_before=None):
+    # Puts a throttled URL back without using up an attempt (claim_urls counted one).
+    # No worker can claim it again before `not_before`.
+    conn = _connect()
+    c = conn.cursor()
+    c.execute('''
+        UPDATE frontier
+        SET status='pending', attempts=MAX(attempts-1, 0), lease_owner=NULL, lease_expires=NULL, not_before=?
+        WHERE crawl_id=? AND url=? AND lease_owner=?
+    ''', (not_before, crawl_id, url, worker_id))
+    conn.close()
+
+def release_worker(crawl_id, worker_id):
+    # Hands back every URL a cancelled worker still holds
+    conn = _connect()
+    c = conn.cursor()
+    c.execute("UPDATE frontier SET status='pending', attempts=MAX(attempts-1, 0), lease_owner=NULL, lease_expires=NULL WHERE crawl_id=? AND lease_owner=? AND status='leased'",
+            (crawl_id, worker_id))
+    conn.close()
+
+# --- SHARED HOST STATE (POLITENESS) ---
+
+HOST_FIELDS = ("next_allowed", "slot_limit", "latency", "crawl_delay", "throttled", "robots_fetched", "updated")
+
+def get_host(host):
+    conn = _connect()
+    c = conn.cursor()
+    c.execute(f"SELECT {', '.join(HOST_FIELDS)} FROM hosts WHERE host=?", (host,))
+    row = c.fetchone()
+    conn.close()
+    if row:
+        return dict(zip(HOST_FIELDS, row))
+    return None
+
+def update_host(host, fn):
+    # Atomic read-modify-write of one host's state across all worker processes.
+    # fn gets the state dict (defaults if the host is new), edits it in place and
+    # may return a value, which is passed back to the caller. `updated` is stamped
+    # after fn runs, so fn still sees when the host was last touched.
+    conn = _connect()
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        c.execute(f"SELECT {', '.join(HOST_FIELDS)} FROM hosts WHERE host=?", (host,))
+        row = c.fetchone()
+        state = dict(zip(HOST_FIELDS, row)) if row else {
+            "next_allowed": 0.0, "slot_limit": None, "latency": None, "crawl_delay": None, "throttled": 0,
+            "robots_fetched": None, "updated": None,
+        }
+        result = fn(state)
+        state["updated"] = time.time()
+        c.execute(f"INSERT OR REPLACE INTO hosts (host, {', '.join(HOST_FIELDS)}) VALUES (?{', ?' * len(HOST_FIELDS)})",
+                (host,) + tuple(state[f] for f in HOST_FIELDS))
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return result
+
+def get_crawl_progress(crawl_id):
+    # Counts frontier rows per status, e.g. {'pending': 3, 'leased': 1, 'done': 12}
+    conn = _connect()
+    c = conn.cursor()
+    c.execute("SELECT status, COUNT(*) FROM frontier WHERE crawl_id=? GROUP BY status", (crawl_id,))
+    progress = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+    progress.update(dict(c.fetchall()))
+    conn.close()
+    return progress
+
+def get_crawl_page(crawl_id, url, link_limit=None):
+    # The frontier keeps every link; pass link_limit (e.g. GRAPH_LINKS) for a sample
+    conn = _connect()
+    c = conn.cursor()
+    c.execute("SELECT full_data FROM crawl_pages WHERE crawl_id=? AND url=?", (crawl_id, url))
+    row = c.fetchone()
+    conn.close()
+    if row is None:
+        return None
+    data = json.loads(row[0])
+    if link_limit is not None:
+        data["found_links"] = data.get("found_links", [])[:link_limit]
+    return data
+
+def get_url_state(crawl_id, url):
+    # Frontier status of one URL, e.g. why a page never made it into crawl_pages
+    conn = _connect()
+    c = conn.cursor()
+    c.execute("SELECT status, attempts, last_error FROM frontier WHERE crawl_id=? AND url=?", (crawl_id, url))
+    row = c.fetchone()
+    conn.close()
+    if row:
+        return {"status": row[0], "attempts": row[1], "last_error": row[2]}
+    return None
+
+def iter_crawl_pages(crawl_id, batch=500):
+    # Streams (url, depth, data) for every fetched page without loading the whole crawl
+    conn = _connect()
+    c = conn.cursor()
+    c.execute("SELECT url, depth, full_data FROM crawl_pages WHERE crawl_id=? ORDER BY rowid", (crawl_id,))
+    try:
+        while True:
+            rows = c.fetchmany(batch)
+            if not rows:
+                break
+            for url, depth, data_str in rows:
+                yield url, depth, json.loads(data_str)
+    finally:
+        conn.close()
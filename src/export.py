@@ -0,0 +1,204 @@
+import os
+import shutil
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+import database as db
+
+EXPORT_DIR = "exports"
+BATCH_ROWS = 50_000  # Rows buffered per table before flushing a record batch
+
+# One dataset per format and table, partitioned Hive-style:
+# exports/<fmt>/<table>/scan_id=<id>/part-0.<ext>
+# scan_id lives in the directory name, so it isn't repeated inside the files.
+# Parquet and Arrow exports never share a directory, so a dataset is never mixed.
+SCHEMAS = {
+    "scans": pa.schema([
+        ("url", pa.string()),
+        ("score", pa.int32()),
+        ("timestamp", pa.string()),
+        ("crawl_id", pa.int64()),
+    ]),
+    "pages": pa.schema([
+        ("url", pa.string()),
+        ("depth", pa.int32()),
+        ("status_code", pa.int32()),
+        ("load_time", pa.float64()),
+        ("title", pa.string()),
+        ("meta_desc", pa.string()),
+        ("image_count", pa.int32()),
+        ("missing_alt", pa.int32()),
+        ("internal_links_count", pa.int32()),
+        ("page_text", pa.string()),
+    ]),
+    "links": pa.schema([
+        ("source", pa.string()),
+        ("target", pa.string()),
+    ]),
+    "images": pa.schema([
+        ("page_url", pa.string()),
+        ("src", pa.string()),
+        ("alt", pa.string()),
+    ]),
+    "security_headers": pa.schema([
+        ("url", pa.string()),
+        ("hsts", pa.bool_()),
+        ("x_frame", pa.bool_()),
+        ("x_content_type", pa.bool_()),
+        ("csp", pa.bool_()),
+    ]),
+}
+
+# "parquet" = compressed, best for storage; "arrow" = Arrow IPC files, memory-mappable
+FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+
+class _BatchWriter:
+    # Buffers rows column-wise and flushes them as record batches
+    def __init__(self, path, schema, fmt):
+        self.schema = schema
+        self.columns = {name: [] for name in schema.names}
+        self.rows = 0
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, schema, compression="zstd")
+        else:
+            self._writer = ipc.new_file(path, schema)
+
+    def add(self, *values):
+        for name, value in zip(self.schema.names, values):
+            self.columns[name].append(value)
+        self.rows += 1
+        if self.rows >= BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self._writer.write_batch(pa.record_batch([self.columns[n] for n in self.schema.names], schema=self.schema))
+            self.columns = {name: [] for name in self.schema.names}
+            self.rows = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+def _table_dir(out_dir, fmt, table):
+    return os.path.join(out_dir, fmt, table)
+
+def _partition_dir(out_dir, fmt, table, scan_id):
+    return os.path.join(_table_dir(out_dir, fmt, table), f"scan_id={scan_id}")
+
+def _tmp_dir(out_dir, fmt, table, scan_id):
+    # Leading underscore: pyarrow dataset discovery skips half-written exports
+    return os.path.join(_table_dir(out_dir, fmt, table), f"_tmp_scan_id={scan_id}")
+
+def export_scan(scan_id, out_dir=EXPORT_DIR, fmt="parquet"):
+
+    # Writes one scan (every crawled page, its links, images and security headers)
+    # as columnar files. Pages are streamed from SQLite, never all loaded at once.
+    # Re-exporting a scan replaces its partitions.
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (use one of {list(FORMATS)})")
+    meta = db.get_scan_meta(scan_id)
+    if meta is None:
+        raise ValueError(f"Unknown scan id: {scan_id}")
+
+    # Build every partition in a temp dir, then swap them in
+    writers, paths = {}, {}
+    for table, schema in SCHEMAS.items():
+        tmp_dir = _tmp_dir(out_dir, fmt, table, scan_id)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        writers[table] = _BatchWriter(os.path.join(tmp_dir, f"part-0.{fmt}"), schema, fmt)
+
+    try:
+        writers["scans"].add(meta["url"], meta["score"], meta["timestamp"], meta["crawl_id"])
+
+        if meta["crawl_id"] is not None:
+            pages = db.iter_crawl_pages(meta["crawl_id"])
+        else:
+            # Scans saved before crawl jobs only have the root page
+            pages = [(meta["url"], 0, db.get_scan_by_id(scan_id) or {})]
+
+        for url, depth, data in pages:
+            images = data.get('images', [])
+            writers["pages"].add(
+                url, depth, data.get('status_code'), data.get('load_time'),
+                data.get('title'), data.get('meta_desc'), len(images),
+                len([img for img in images if not img['alt']]),
+                data.get('internal_links_count'), data.get('page_text'),
+            )
+            for link in data.get('found_links', []):
+                writers["links"].add(url, link)
+            for img in images:
+                writers["images"].add(url, img['src'], img['alt'])
+            sec = data.get('security_headers', {})
+            writers["security_headers"].add(
+                url, sec.get('hsts'), sec.get('x_frame'), sec.get('x_content_type'), sec.get('csp'),
+            )
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    for table in SCHEMAS:
+        final_dir = _partition_dir(out_dir, fmt, table, scan_id)
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(_tmp_dir(out_dir, fmt, table, scan_id), final_dir)
+        paths[table] = os.path.join(final_dir, f"part-0.{fmt}")
+    return paths
+
+def export_all(out_dir=EXPORT_DIR, fmt="parquet", skip_existing=True):
+    # Exports every scan in the history (scans already exported in this format are skipped)
+    exported = []
+    scan_ids = [row[0] for row in db.get_recent_scans(limit=-1)]
+    for scan_id in scan_ids:
+        if skip_existing and os.path.isdir(_partition_dir(out_dir, fmt, "pages", scan_id)):
+            continue
+        export_scan(scan_id, out_dir, fmt)
+        exported.append(scan_id)
+    return exported
+
+def open_dataset(table, out_dir=EXPORT_DIR, fmt="parquet"):
+
+    # Lazy view over one table across all exported scans.
+    # Nothing is read until you call .to_table()/.scanner(), and only the
+    # columns / scan_id partitions you ask for are touched.
+
+    return ds.dataset(_table_dir(out_dir, fmt, table), format=FORMATS[fmt], partitioning="hive")
+
+def read_scan_table(table, scan_id, out_dir=EXPORT_DIR, fmt="parquet"):
+    # Reads a single scan's partition, memory-mapped (zero-copy for Arrow IPC files)
+    path = os.path.join(_partition_dir(out_dir, fmt, table, scan_id), f"part-0.{fmt}")
+    if fmt == "arrow":
+        return ipc.open_file(pa.memory_map(path)).read_all()
+    return pq.read_table(path, memory_map=True)
+
+def scan_trends(url=None, out_dir=EXPORT_DIR, fmt="parquet"):
+
+    # Per-scan SEO trend table (one row per scan), e.g. for dashboards.
+    # The small scans table is filtered first; pages are then read only from
+    # the matching scan_id partitions and only for the columns needed.
+
+    scan_filter = (ds.field("url") == url) if url else None
+    scans = open_dataset("scans", out_dir, fmt).to_table(
+        columns=["scan_id", "url", "score", "timestamp"], filter=scan_filter
+    )
+
+    page_filter = ds.field("scan_id").isin(scans["scan_id"]) if url else None
+    pages = open_dataset("pages", out_dir, fmt).to_table(
+        columns=["scan_id", "status_code", "load_time", "title", "meta_desc", "missing_alt"],
+        filter=page_filter,
+    )
+    pages = pages.append_column("missing_title", pc.equal(pages["title"], "Missing"))
+    pages = pages.append_column("missing_meta", pc.equal(pages["meta_desc"], "Missing"))
+    pages = pages.append_column("broken", pc.not_equal(pages["status_code"], 200))
+    stats = pages.group_by("scan_id").aggregate([
+        ("load_time", "mean"),
+        ("load_time", "count"),
+        ("missing_title", "sum"),
+        ("missing_meta", "sum"),
+        ("broken", "sum"),
+        ("missing_alt", "sum"),
+    ])
+    return scans.join(stats, "scan_id").sort_by("timestamp")
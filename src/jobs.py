@@ -0,0 +1,96 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import database as db
+from crawler import run_crawl_worker
+
+# Streamlit re-runs app.py on every interaction but keeps imported modules alive,
+# so this registry and pool survive reruns and are shared by every user session.
+MAX_CONCURRENT_AUDITS = 4
+DEEP_SCAN_PAGES = 50
+JOB_TTL_SECONDS = 3600  # Forget finished jobs after an hour
+
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_AUDITS, thread_name_prefix="audit")
+_jobs = {}
+_lock = threading.Lock()
+
+def _update(job_id, **fields):
+    with _lock:
+        _jobs[job_id].update(fields)
+
+def _prune():
+    # Called with the lock held
+    now = time.time()
+    for job_id in [j for j, job in _jobs.items()
+                   if job["finished"] and now - job["finished"] > JOB_TTL_SECONDS]:
+        del _jobs[job_id]
+
+def _run_audit(job_id, url, deep_scan, score_fn):
+    try:
+        _update(job_id, status="running", started=time.time())
+        if deep_scan:
+            crawl_id = db.create_crawl(url, max_depth=1, max_pages=DEEP_SCAN_PAGES)
+        else:
+            # A single-page audit is interactive: one try, like a plain fetch
+            crawl_id = db.create_crawl(url, max_depth=0, max_pages=1, max_attempts=1)
+        _update(job_id, crawl_id=crawl_id)
+
+        run_crawl_worker(crawl_id)
+
+        data = db.get_crawl_page(crawl_id, url, link_limit=db.GRAPH_LINKS)
+        if data is None:
+            # Root page never made it through the frontier
+            state = db.get_url_state(crawl_id, url) or {}
+            data = {"error": state.get("last_error") or "Page could not be fetched"}
+
+        if data.get("error"):
+            _update(job_id, status="error", error=data["error"], result=data, finished=time.time())
+            return
+
+        score = score_fn(data)
+        scan_id = db.save_scan(url, score, data, crawl_id=crawl_id)
+        _update(job_id, status="done", result=data, score=score, scan_id=scan_id, finished=time.time())
+    except Exception as e:
+        _update(job_id, status="error", error=str(e), result={"error": str(e)}, finished=time.time())
+
+def submit_audit(url, deep_scan=True, score_fn=None):
+    # Queues an audit in the background and returns its job id right away
+    job_id = uuid.uuid4().hex
+    with _lock:
+        _prune()
+        _jobs[job_id] = {
+            "id": job_id,
+            "url": url,
+            "status": "queued",
+            "submitted": time.time(),
+            "started": None,
+            "finished": None,
+            "crawl_id": None,
+            "scan_id": None,
+            "score": None,
+            "result": None,
+            "error": None,
+        }
+    _executor.submit(_run_audit, job_id, url, deep_scan, score_fn or (lambda data: None))
+    return job_id
+
+def get_job(job_id):
+    # Snapshot of the job plus live crawl progress (pages, queue, errors, ETA)
+    with _lock:
+        job = dict(_jobs[job_id]) if job_id in _jobs else None
+    if job is None:
+        return None
+
+    progress = {"fetched": 0, "queued": 0, "errors": 0, "eta": None}
+    if job["crawl_id"] is not None:
+        counts = db.get_crawl_progress(job["crawl_id"])
+        progress["fetched"] = counts["done"]
+        progress["queued"] = counts["pending"] + counts["leased"]
+        progress["errors"] = counts["failed"]
+        if job["started"] and counts["done"] and progress["queued"]:
+            per_page = (time.time() - job["started"]) / counts["done"]
+            progress["eta"] = round(per_page * progress["queued"], 1)
+    job["progress"] = progress
+    return job
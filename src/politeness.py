@@ -0,0 +1,312 @@
+import threading
+import time
+import email.utils
+import requests
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+import database as db
+
+# Status codes that mean "slow down", not "this page is broken"
+THROTTLE_CODES = (429, 503)
+
+ROBOTS_TTL = 24 * 3600   # Re-read robots.txt once a day
+HOST_STATE_TTL = 3600    # Forget a host's learned limit / latency after an idle hour
+
+class HostScheduler:
+    """
+    Per-host politeness + adaptive concurrency (AIMD), shared by all workers.
+
+    The per-host limit, latency, robots crawl-delay and next allowed request
+    time live in the SQLite `hosts` table, so every worker process of a crawl
+    sees the same limit and the same back-off. Requests to a host are spaced
+    latency / limit apart (about `limit` in flight across all processes), never
+    closer than the crawl-delay and never before a Retry-After.
+
+    Fast, healthy responses raise the limit slowly (additive increase);
+    429/503, errors and slow responses halve it (multiplicative decrease).
+
+    Start times are booked at most `reserve_ahead` seconds (or one spacing)
+    ahead, so a worker never sits on a far-future booking, and a cancelled
+    booking is handed back.
+    """
+
+    def __init__(self, user_agent="*", min_concurrency=1, max_concurrency=8,
+                 start_concurrency=2, target_latency=1.5, base_timeout=5, max_timeout=30,
+                 max_pause=None, reserve_ahead=2.0, renew_every=None):
+        self.user_agent = user_agent
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.start_concurrency = start_concurrency
+        self.target_latency = target_latency
+        self.base_timeout = base_timeout
+        self.max_timeout = max_timeout
+        # Never back off longer than a worker can hold a lease
+        self.max_pause = max_pause if max_pause is not None else db.LEASE_SECONDS / 2
+        self.reserve_ahead = reserve_ahead
+        # How often acquire() runs its keep_alive callback while a caller waits
+        self.renew_every = renew_every if renew_every is not None else db.LEASE_SECONDS / 4
+        self._hosts = {}  # this process only: active slots, stats, last seen shared state
+        self._cond = threading.Condition()
+        self._booked = threading.local()  # (host, start, end) of this thread's last booking
+
+    def _local(self, host):
+        # Called with the lock held
+        if host not in self._hosts:
+            self._hosts[host] = {
+                "active": 0,
+                "limit": float(self.start_concurrency),
+                "latency": None,
+                "crawl_delay": None,
+                "robots_checked": False,
+                "requests": 0,
+                "errors": 0,
+                "throttled": 0,
+                "bytes": 0,
+                "first_request": None,
+            }
+        return self._hosts[host]
+
+    def _load_robots(self, url):
+        # Reads the crawl-delay for this host from robots.txt.
+        # 0 if the host has no robots.txt (4xx); None if we couldn't tell
+        # (timeout, connection error, 5xx), so the next worker tries again.
+        parsed = urlparse(url)
+        try:
+            resp = requests.get(f"{parsed.scheme}://{parsed.netloc}/robots.txt", timeout=self.base_timeout)
+        except Exception:
+            return None
+        if 400 <= resp.status_code < 500:
+            return 0.0
+        if resp.status_code != 200:
+            return None
+        rp = RobotFileParser()
+        rp.parse(resp.text.splitlines())
+        delay = float(rp.crawl_delay(self.user_agent) or 0)
+        rate = rp.request_rate(self.user_agent)
+        if rate and rate.requests:
+            delay = max(delay, rate.seconds / rate.requests)
+        return delay
+
+    def _init_host(self, url, host):
+        # First time this process sees the host: make sure the shared row has
+        # a limit and a crawl-delay. robots.txt is fetched once per host and
+        # again after ROBOTS_TTL; state left over from an old crawl is dropped.
+        shared = db.get_host(host)
+        delay = None
+        if shared is None or shared["robots_fetched"] is None or time.time() - shared["robots_fetched"] > ROBOTS_TTL:
+            delay = self._load_robots(url)
+
+        def fill(state):
+            now = time.time()
+            if state["updated"] is None or now - state["updated"] > HOST_STATE_TTL:
+                state.update(slot_limit=None, latency=None, throttled=0)
+            if state["slot_limit"] is None:
+                state["slot_limit"] = float(self.start_concurrency)
+            if delay is not None:
+                # A failed fetch keeps the last known delay (or none) and is retried
+                state["crawl_delay"] = delay
+                state["robots_fetched"] = now
+            return dict(state)
+
+        state = db.update_host(host, fill)
+        with self._cond:
+            local = self._local(host)
+            local.update(limit=state["slot_limit"], latency=state["latency"],
+                         crawl_delay=state["crawl_delay"], robots_checked=True)
+
+    def _reserve(self, state):
+        # Books the next start time for this host in the shared state, unless it is
+        # too far out: then nothing is booked and the caller retries later.
+        # Returns (booked, start, spacing, limit).
+        now = time.time()
+        latency = state["latency"] or self.target_latency
+        spacing = max(state["crawl_delay"] or 0.0, latency / state["slot_limit"])
+        start = max(now, state["next_allowed"])
+        if start - now > max(self.reserve_ahead, spacing):
+            return False, start, spacing, state["slot_limit"]
+        state["next_allowed"] = start + spacing
+        return True, start, spacing, state["slot_limit"]
+
+    def _wait_until(self, when, still_wanted):
+        # Sleeps until `when` in renew_every chunks; False if the caller gave up
+        while True:
+            wait = when - time.time()
+            if wait <= 0:
+                return True
+            time.sleep(min(wait, self.renew_every))
+            if not still_wanted():
+                return False
+
+    def acquire(self, url, keep_alive=None):
+        # Blocks until this host has a free slot and its shared start time has come.
+        # keep_alive (e.g. a lease renewal) runs every renew_every seconds while we
+        # wait and once more when the slot is granted. If it returns False we stop
+        # waiting, give the slot and any booking back, and return False.
+        host = urlparse(url).netloc
+        with self._cond:
+            needs_init = not self._local(host)["robots_checked"]
+        if needs_init:
+            self._init_host(url, host)
+
+        last_renewal = time.time()
+
+        def still_wanted(force=False):
+            nonlocal last_renewal
+            if keep_alive is None or (not force and time.time() - last_renewal < self.renew_every):
+                return True
+            last_renewal = time.time()
+            return keep_alive()
+
+        # 1. A free slot in this process
+        while True:
+            with self._cond:
+                local = self._local(host)
+                if local["active"] < int(local["limit"]):
+                    local["active"] += 1
+                    break
+                self._cond.wait(timeout=1.0)
+            if not still_wanted():
+                return False
+
+        # 2. A booked start time, no further out than reserve_ahead / one spacing
+        while True:
+            booked, start, spacing, limit = db.update_host(host, self._reserve)
+            with self._cond:
+                local["limit"] = limit
+            if booked:
+                break
+            retry_at = start - max(self.reserve_ahead, spacing)
+            if not self._wait_until(max(retry_at, time.time() + 0.05), still_wanted):
+                self._free_slot(host)
+                return False
+        self._booked.value = (host, start, start + spacing)
+
+        # 3. Wait for the booked start, then confirm once more right before the request
+        if not self._wait_until(start, still_wanted) or not still_wanted(force=True):
+            self.cancel(url)
+            return False
+
+        with self._cond:
+            if local["first_request"] is None:
+                local["first_request"] = time.time()
+        return True
+
+    def _free_slot(self, host):
+        with self._cond:
+            local = self._local(host)
+            local["active"] = max(0, local["active"] - 1)
+            self._cond.notify_all()
+
+    def _take_booking(self, host):
+        # This thread's booking for `host` (cleared, so it's only used once)
+        booking = getattr(self._booked, "value", None)
+        self._booked.value = None
+        return booking if booking and booking[0] == host else None
+
+    def cancel(self, url):
+        # Gives a slot back without a request having been made. The booked start
+        # time is handed back too, unless another worker has booked after it.
+        host = urlparse(url).netloc
+        booking = self._take_booking(host)
+        if booking is not None:
+            _, start, end = booking
+
+            def unbook(state):
+                if state["next_allowed"] == end:
+                    state["next_allowed"] = start
+
+            db.update_host(host, unbook)
+        self._free_slot(host)
+
+    def release(self, url, status_code=None, latency=None, headers=None, size=0, error=False):
+        # Reports the outcome of a request and adapts the host's shared limit
+        host = urlparse(url).netloc
+        self._take_booking(host)
+        throttled = status_code in THROTTLE_CODES
+        failed = error or (status_code is not None and status_code >= 500 and not throttled)
+        pause = parse_retry_after((headers or {}).get("Retry-After")) if throttled else None
+
+        def adapt(state):
+            if latency is not None:
+                prev = state["latency"]
+                state["latency"] = latency if prev is None else 0.8 * prev + 0.2 * latency
+
+            limit = state["slot_limit"] or float(self.start_concurrency)
+            if throttled:
+                state["throttled"] += 1
+                limit = limit / 2
+                # No hint from the server: exponential backoff on repeated throttling
+                wait = pause if pause is not None else 2 ** min(state["throttled"], 6)
+                state["next_allowed"] = max(state["next_allowed"], time.time() + min(wait, self.max_pause))
+            elif failed:
+                limit = limit / 2
+            elif state["latency"] is not None and state["latency"] > self.target_latency:
+                limit = limit * 0.75
+            else:
+                # Roughly +1 slot per "window" of successful responses
+                state["throttled"] = 0
+                limit = limit + 1 / limit
+            state["slot_limit"] = min(self.max_concurrency, max(self.min_concurrency, limit))
+            return state["slot_limit"], state["latency"]
+
+        limit, shared_latency = db.update_host(host, adapt)
+        with self._cond:
+            local = self._local(host)
+            local["active"] = max(0, local["active"] - 1)
+            local["limit"] = limit
+            local["latency"] = shared_latency
+            local["requests"] += 1
+            local["bytes"] += size
+            if throttled:
+                local["throttled"] += 1
+            elif failed:
+                local["errors"] += 1
+            self._cond.notify_all()
+
+    def next_allowed(self, url):
+        # Earliest time any worker may hit this host again (e.g. after a Retry-After)
+        shared = db.get_host(urlparse(url).netloc)
+        return shared["next_allowed"] if shared else time.time()
+
+    def timeout_for(self, url):
+        # Slow hosts get a longer timeout instead of a fixed 5 seconds
+        host = urlparse(url).netloc
+        with self._cond:
+            latency = self._local(host)["latency"]
+        if latency is None:
+            return self.base_timeout
+        return min(self.max_timeout, max(self.base_timeout, latency * 4))
+
+    def stats(self):
+        # Per-host throughput of this worker, plus the shared limit / latency
+        now = time.time()
+        with self._cond:
+            out = {}
+            for host, s in self._hosts.items():
+                elapsed = now - s["first_request"] if s["first_request"] else 0
+                out[host] = {
+                    "concurrency": int(s["limit"]),
+                    "active": s["active"],
+                    "requests": s["requests"],
+                    "errors": s["errors"],
+                    "throttled": s["throttled"],
+                    "avg_latency": round(s["latency"], 3) if s["latency"] is not None else None,
+                    "crawl_delay": s["crawl_delay"],
+                    "pages_per_sec": round(s["requests"] / elapsed, 2) if elapsed > 0 else 0.0,
+                    "kb_per_sec": round(s["bytes"] / 1024 / elapsed, 1) if elapsed > 0 else 0.0,
+                }
+            return out
+
+def parse_retry_after(value):
+    # Retry-After is either a number of seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,242 @@
+import tempfile
+import threading
+from array import array
+from collections.abc import Mapping
+from urllib.parse import urlsplit
+
+# Same keys crawl_url() returns for a successful page
+PAGE_KEYS = ("status_code", "load_time", "title", "meta_desc", "images",
+             "internal_links_count", "found_links", "page_text", "security_headers")
+
+# security_headers packed into one byte per page
+SECURITY_FLAGS = (("hsts", 1), ("x_frame", 2), ("x_content_type", 4), ("csp", 8))
+
+class UrlTable:
+    """
+    Interns URLs as integer node ids, one (host id, path) pair per URL.
+    The lookup is keyed per host by path, so each path string is stored once
+    and never the full URL. report_gen counts link in-degrees with one of these.
+    """
+
+    def __init__(self):
+        self._node_ids = {}             # host id -> {path: node id}
+        self._node_host = array('I')
+        self._node_path = []
+        self._host_ids = {}
+        self._hosts = []
+
+    def intern(self, url):
+        # Returns the integer node id for a URL, adding it if it's new
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        if not parts.netloc or not url.startswith(host):
+            host = ""  # data: URIs, relative paths etc. are stored whole
+        host_id = self._host_ids.get(host)
+        if host_id is None:
+            host_id = self._host_ids[host] = len(self._hosts)
+            self._hosts.append(host)
+            self._node_ids[host_id] = {}
+        paths = self._node_ids[host_id]
+        path = url[len(host):]
+        node_id = paths.get(path)
+        if node_id is None:
+            node_id = paths[path] = len(self._node_path)
+            self._node_host.append(host_id)
+            self._node_path.append(path)
+        return node_id
+
+    def url(self, node_id):
+        return self._hosts[self._node_host[node_id]] + self._node_path[node_id]
+
+    def __len__(self):
+        return len(self._node_path)
+
+class PageStore:
+    """
+    Memory-compact storage for crawl results.
+
+    Instead of one dict (with nested lists and dicts) per page, every field is a
+    column: numbers live in typed arrays, URLs are interned once as integer node
+    IDs (host + path), links/images are flat ID arrays with offsets, and page text
+    is spilled to a temp file on disk. store[i] returns a PageView, a read-only
+    dict-like view that existing consumers (create_pdf, save_scan) accept.
+    """
+
+    def __init__(self, spill_dir=None):
+        self._urls = UrlTable()
+
+        # One entry per page
+        self._page_node = array('I')
+        self._status = array('H')       # 0 = unknown
+        self._load_time = array('f')
+        self._links_count = array('I')
+        self._security = array('B')
+        self._title = []
+        self._meta = []
+        self._strings = {}              # store-owned dedup for repeated titles / alt text
+        self._errors = {}               # page index -> error message (failed fetches)
+
+        # Variable-length fields: flat arrays + per-page offsets
+        self._link_offsets = array('Q', [0])
+        self._link_targets = array('I')
+        self._image_offsets = array('Q', [0])
+        self._image_src = array('I')
+        self._image_alt = []
+
+        # Page text goes to disk; only offsets stay in RAM
+        self._text_file = tempfile.TemporaryFile(dir=spill_dir)
+        self._text_offsets = array('Q')
+        self._text_lengths = array('I')
+        self._text_end = 0
+        self._text_lock = threading.Lock()
+
+    # --- URL interning ---
+
+    def intern_url(self, url):
+        return self._urls.intern(url)
+
+    def _dedup(self, text):
+        # Repeated strings ("Missing", shared titles, common alt text) are kept once.
+        # Unlike sys.intern, this table goes away with the store.
+        return self._strings.setdefault(text, text)
+
+    def node_url(self, node_id):
+        return self._urls.url(node_id)
+
+    def node_count(self):
+        return len(self._urls)
+
+    # --- Writing ---
+
+    def append(self, url, data):
+        # Adds one crawl_url() result and returns its page index
+        index = len(self._page_node)
+        self._page_node.append(self.intern_url(url))
+
+        if data.get("error"):
+            self._errors[index] = data["error"]
+            data = {}
+
+        self._status.append(data.get("status_code") or 0)
+        self._load_time.append(data.get("load_time", 0.0))
+        self._links_count.append(data.get("internal_links_count", 0))
+        self._title.append(self._dedup(data.get("title", "Missing")))
+        self._meta.append(self._dedup(data.get("meta_desc", "Missing")))
+
+        sec = data.get("security_headers", {})
+        self._security.append(sum(bit for key, bit in SECURITY_FLAGS if sec.get(key)))
+
+        for link in data.get("found_links", []):
+            self._link_targets.append(self.intern_url(link))
+        self._link_offsets.append(len(self._link_targets))
+
+        for img in data.get("images", []):
+            self._image_src.append(self.intern_url(img["src"]))
+            self._image_alt.append(self._dedup(img["alt"]) if img["alt"] else "")
+        self._image_offsets.append(len(self._image_src))
+
+        text = data.get("page_text", "").encode("utf-8")
+        with self._text_lock:
+            self._text_file.seek(self._text_end)
+            self._text_file.write(text)
+            self._text_offsets.append(self._text_end)
+            self._text_lengths.append(len(text))
+            self._text_end += len(text)
+        return index
+
+    # --- Reading ---
+
+    def __len__(self):
+        return len(self._page_node)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("page index out of range")
+        return PageView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield PageView(self, index)
+
+    def page_url(self, index):
+        return self.node_url(self._page_node[index])
+
+    def link_ids(self, index):
+        # Outgoing links of a page as node ids (no string materialization)
+        return self._link_targets[self._link_offsets[index]:self._link_offsets[index + 1]]
+
+    def _page_text(self, index):
+        with self._text_lock:
+            self._text_file.seek(self._text_offsets[index])
+            return self._text_file.read(self._text_lengths[index]).decode("utf-8")
+
+    def _field(self, index, key):
+        if key == "status_code":
+            return self._status[index]
+        if key == "load_time":
+            return round(self._load_time[index], 2)  # undo float32 noise
+        if key == "title":
+            return self._title[index]
+        if key == "meta_desc":
+            return self._meta[index]
+        if key == "internal_links_count":
+            return self._links_count[index]
+        if key == "found_links":
+            return [self.node_url(n) for n in self.link_ids(index)]
+        if key == "images":
+            start, end = self._image_offsets[index], self._image_offsets[index + 1]
+            return [{"src": self.node_url(self._image_src[i]), "alt": self._image_alt[i]}
+                    for i in range(start, end)]
+        if key == "page_text":
+            return self._page_text(index)
+        if key == "security_headers":
+            bits = self._security[index]
+            return {name: bool(bits & bit) for name, bit in SECURITY_FLAGS}
+        raise KeyError(key)
+
+    def close(self):
+        self._text_file.close()
+        self._strings.clear()
+
+class PageView(Mapping):
+    """
+    Read-only, dict-compatible view of one page in a PageStore.
+    Fields are rebuilt on access, so holding views costs almost nothing.
+    """
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    @property
+    def url(self):
+        return self._store.page_url(self._index)
+
+    def _keys(self):
+        if self._index in self._store._errors:
+            return ("error",)
+        return PAGE_KEYS
+
+    def __getitem__(self, key):
+        if key not in self._keys():
+            raise KeyError(key)
+        if key == "error":
+            return self._store._errors[self._index]
+        return self._store._field(self._index, key)
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def to_dict(self):
+        # Plain dict copy, e.g. for json.dumps / db.save_scan
+        return {key: self[key] for key in self._keys()}
+
+    def __repr__(self):
+        return f"PageView({self.url!r})"
@@ -1,5 +1,17 @@
 from fpdf import FPDF
 import datetime
+import hashlib
+import multiprocessing
+import os
+import heapq
+import threading
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import database as db
+from records import UrlTable
+
+REPORT_DIR = "reports"
 
 class PDFReport(FPDF):
     def header(self):
@@ -20,6 +32,29 @@ class PDFReport(FPDF):
         self.set_text_color(128)
         self.cell(0, 10, f'Page {self.page_no()} | Generated by Smart-Spider AI', 0, 0, 'C')
 
+def _score_badge(pdf, score):
+    pdf.set_font("Arial", "B", 50)
+    if score > 80:
+        pdf.set_text_color(16, 185, 129) # Green
+    elif score > 50:
+        pdf.set_text_color(245, 158, 11) # Orange
+    else:
+        pdf.set_text_color(239, 68, 68) # Red
+        
+    pdf.cell(0, 20, f"{score}/100", 0, 1, 'C')
+    
+    pdf.set_font("Arial", "B", 12)
+    pdf.set_text_color(0)
+    pdf.cell(0, 10, "OVERALL HEALTH SCORE", 0, 1, 'C')
+    pdf.ln(10)
+
+def _clean(text, max_len=None):
+    # FPDF only speaks latin-1; also trim long values so table rows stay one line
+    text = str(text)
+    if max_len and len(text) > max_len:
+        text = text[:max_len - 2] + ".."
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
 # ---> THE FIX IS HERE: Added action_plan=None to the arguments <---
 def create_pdf(url, data, score, action_plan=None):
     pdf = PDFReport()
@@ -35,20 +70,7 @@ def create_pdf(url, data, score, action_plan=None):
     pdf.ln(5)
 
     # 2. Score Badge
-    pdf.set_font("Arial", "B", 50)
-    if score > 80:
-        pdf.set_text_color(16, 185, 129) # Green
-    elif score > 50:
-        pdf.set_text_color(245, 158, 11) # Orange
-    else:
-        pdf.set_text_color(239, 68, 68) # Red
-        
-    pdf.cell(0, 20, f"{score}/100", 0, 1, 'C')
-    
-    pdf.set_font("Arial", "B", 12)
-    pdf.set_text_color(0)
-    pdf.cell(0, 10, "OVERALL HEALTH SCORE", 0, 1, 'C')
-    pdf.ln(10)
+    _score_badge(pdf, score)
 
     # 3. Technical Metrics Table
     pdf.set_font("Arial", "B", 14)
@@ -137,4 +159,228 @@ def create_pdf(url, data, score, action_plan=None):
     pdf.set_text_color(100)
     pdf.cell(0, 10, "*** End of Official Audit Report ***", 0, 1, 'C')
 
-    return pdf.output(dest='S').encode('latin-1')
\ No newline at end of file
+    return pdf.output(dest='S').encode('latin-1')
+
+
+# --- SITE-WIDE REPORT (MULTI-PAGE AUDITS) ---
+
+# Page-level checks shown in the "Top Issues" table
+PAGE_ISSUES = [
+    ("Non-200 server response", lambda d: d.get('status_code') != 200),
+    ("Missing title tag", lambda d: d.get('title') == "Missing"),
+    ("Missing meta description", lambda d: d.get('meta_desc') == "Missing"),
+    ("Slow load (> 2 seconds)", lambda d: d.get('load_time', 0) > 2.0),
+    ("Images missing alt-text", lambda d: any(not img['alt'] for img in d.get('images', []))),
+    ("Missing HSTS header", lambda d: not d.get('security_headers', {}).get('hsts')),
+    ("Missing CSP header", lambda d: not d.get('security_headers', {}).get('csp')),
+    ("Missing X-Frame-Options", lambda d: not d.get('security_headers', {}).get('x_frame')),
+    ("Missing X-Content-Type-Options", lambda d: not d.get('security_headers', {}).get('x_content_type')),
+]
+
+# Per-page table layout: (header, width)
+PAGE_COLUMNS = [("URL", 82), ("Code", 14), ("Load (s)", 18), ("Images", 16), ("No Alt", 16), ("Links", 16), ("Title", 14), ("Meta", 14)]
+
+def _iter_scan_pages(meta):
+    # Streams pages for a scan: every crawled page, or just the stored page for old scans
+    if meta["crawl_id"] is not None:
+        for url, depth, data in db.iter_crawl_pages(meta["crawl_id"]):
+            yield url, depth, data
+    else:
+        data = db.get_scan_by_id(meta["id"])
+        if data:
+            yield meta["url"], 0, data
+
+def _collect_site_stats(meta):
+    # First pass: only counters are kept in memory, never the page data itself.
+    # Link in-degrees are counted per interned node id, not per URL string.
+    stats = {"pages": 0, "load_total": 0.0, "images": 0, "missing_alt": 0, "edges": 0}
+    issues = Counter()
+    urls = UrlTable()
+    inbound = array('I')
+
+    for url, depth, data in _iter_scan_pages(meta):
+        images = data.get('images', [])
+        stats["pages"] += 1
+        stats["load_total"] += data.get('load_time', 0)
+        stats["images"] += len(images)
+        stats["missing_alt"] += len([img for img in images if not img['alt']])
+        links = data.get('found_links', [])
+        stats["edges"] += len(links)
+        for link in links:
+            node_id = urls.intern(link)
+            if node_id == len(inbound):
+                inbound.append(0)
+            inbound[node_id] += 1
+        for name, check in PAGE_ISSUES:
+            if check(data):
+                issues[name] += 1
+
+    top = heapq.nlargest(5, range(len(inbound)), key=inbound.__getitem__)
+    stats["top_linked"] = [(urls.url(n), inbound[n]) for n in top]
+    return stats, issues
+
+def _page_table_header(pdf):
+    pdf.set_font("Arial", "B", 8)
+    pdf.set_fill_color(240, 240, 240)
+    for header, width in PAGE_COLUMNS:
+        pdf.cell(width, 7, header, 1, 0, 'C', 1)
+    pdf.ln()
+    pdf.set_font("Arial", "", 7)
+
+def build_site_report(scan_id, path, action_plan=None):
+    
+    # Builds the site-wide PDF straight to `path`.
+    # Pages are streamed from SQLite twice (stats, then table) so only counters
+    # and the link targets' node ids are held in memory, never the pages.
+    
+    meta = db.get_scan_meta(scan_id)
+    if meta is None:
+        raise ValueError(f"Unknown scan id: {scan_id}")
+    stats, issues = _collect_site_stats(meta)
+    score = meta["score"] or 0
+
+    pdf = PDFReport()
+    pdf.set_auto_page_break(True, margin=20)
+    pdf.add_page()
+
+    # 1. Audit Summary
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, _clean(f"Target: {meta['url']}", 90), 0, 1)
+    pdf.set_font("Arial", "", 10)
+    pdf.set_text_color(100)
+    pdf.cell(0, 10, f"Scan Date: {str(meta['timestamp'])[:16]} | Scan #{scan_id}", 0, 1)
+    pdf.ln(5)
+    _score_badge(pdf, score)
+
+    # 2. Site Overview + Link Graph
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Site Overview", 0, 1)
+    pages = stats["pages"] or 1
+    overview = [
+        ("Pages Audited", str(stats["pages"])),
+        ("Average Load Speed", f"{round(stats['load_total'] / pages, 2)} seconds"),
+        ("Total Images", str(stats["images"])),
+        ("Images Missing Alt-Text", str(stats["missing_alt"])),
+        ("Internal Links (Graph Edges)", str(stats["edges"])),
+        ("Average Links per Page", str(round(stats["edges"] / pages, 1))),
+    ]
+    pdf.set_font("Arial", "", 10)
+    for metric, value in overview:
+        pdf.cell(95, 8, metric, 1)
+        pdf.cell(95, 8, value, 1, 1)
+    pdf.ln(5)
+
+    if stats["top_linked"]:
+        pdf.set_font("Arial", "B", 10)
+        pdf.cell(0, 8, "Most Linked Pages", 0, 1)
+        pdf.set_font("Arial", "", 9)
+        for url, count in stats["top_linked"]:
+            pdf.cell(160, 7, _clean(url, 95), 1)
+            pdf.cell(30, 7, str(count), 1, 1, 'C')
+        pdf.ln(5)
+
+    # 3. Top Issues
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Top Issues", 0, 1)
+    pdf.set_font("Arial", "B", 10)
+    pdf.set_fill_color(240, 240, 240)
+    pdf.cell(130, 8, "Issue", 1, 0, 'C', 1)
+    pdf.cell(60, 8, "Pages Affected", 1, 1, 'C', 1)
+    pdf.set_font("Arial", "", 10)
+    if issues:
+        for name, count in issues.most_common():
+            pdf.cell(130, 8, name, 1)
+            pdf.cell(60, 8, f"{count} ({round(100 * count / pages)}%)", 1, 1, 'C')
+    else:
+        pdf.cell(190, 8, "No issues detected.", 1, 1, 'C')
+
+    # 4. Per-Page Table (second pass)
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Page-by-Page Diagnostics", 0, 1)
+    _page_table_header(pdf)
+    for url, depth, data in _iter_scan_pages(meta):
+        # Repeat the header when the table spills onto a new page
+        if pdf.get_y() + 6 > pdf.page_break_trigger:
+            pdf.add_page()
+            _page_table_header(pdf)
+        images = data.get('images', [])
+        row = [
+            _clean(url, 60),
+            str(data.get('status_code', '-')),
+            str(data.get('load_time', '-')),
+            str(len(images)),
+            str(len([img for img in images if not img['alt']])),
+            str(data.get('internal_links_count', 0)),
+            "OK" if data.get('title') != "Missing" else "MISSING",
+            "OK" if data.get('meta_desc') != "Missing" else "MISSING",
+        ]
+        for value, (_, width) in zip(row, PAGE_COLUMNS):
+            pdf.cell(width, 6, value, 1)
+        pdf.ln()
+
+    # 5. Strategic AI Action Plan
+    if action_plan:
+        pdf.add_page()
+        pdf.set_font("Arial", "B", 14)
+        pdf.cell(0, 10, "AI Strategic Action Plan", 0, 1)
+        pdf.ln(5)
+        pdf.set_font("Arial", "", 10)
+        pdf.multi_cell(0, 8, _clean(action_plan))
+
+    pdf.ln(10)
+    pdf.set_text_color(100)
+    pdf.cell(0, 10, "*** End of Official Audit Report ***", 0, 1, 'C')
+
+    # Write to a temp file first so a half-written PDF is never served from the cache
+    tmp_path = path + ".tmp"
+    pdf.output(tmp_path, 'F')
+    os.replace(tmp_path, path)
+    return path
+
+
+# --- BACKGROUND BUILD + CACHE ---
+
+_pool = None
+_pending = {}  # report path -> Future
+_lock = threading.Lock()
+
+def report_path(scan_id, action_plan=None):
+    # One cached PDF per scan (plus one per distinct AI action plan)
+    name = f"scan_{scan_id}"
+    if action_plan:
+        name += "_" + hashlib.sha1(action_plan.encode('utf-8')).hexdigest()[:10]
+    return os.path.join(REPORT_DIR, name + ".pdf")
+
+def submit_report(scan_id, action_plan=None):
+    # Starts building the report in a worker process unless it's cached or already running
+    global _pool
+    path = report_path(scan_id, action_plan)
+    if os.path.exists(path):
+        return path
+    with _lock:
+        future = _pending.get(path)
+        # A finished future with no file on disk means the build failed (or the cache was cleared)
+        if future is None or future.done():
+            os.makedirs(REPORT_DIR, exist_ok=True)
+            if _pool is None:
+                # Spawn, not fork: the Streamlit server is multi-threaded (jobs pool, SQLite handles)
+                _pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+            _pending[path] = _pool.submit(build_site_report, scan_id, path, action_plan)
+    return path
+
+def get_report_status(scan_id, action_plan=None):
+    # Returns ("ready", path), ("running", path), ("error", message) or ("missing", path)
+    path = report_path(scan_id, action_plan)
+    if os.path.exists(path):
+        return "ready", path
+    with _lock:
+        future = _pending.get(path)
+    if future is None:
+        return "missing", path
+    if not future.done():
+        return "running", path
+    if future.exception() is not None:
+        return "error", str(future.exception())
+    # Built, but the cached file has since been deleted
+    return "missing", path
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The app runs as flat modules from src/ (streamlit run src/app.py)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import database as db
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    # Every test gets its own SQLite file instead of spider_history.db
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "test.db"))
+    db.init_db()
+    return db
@@ -0,0 +1,56 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+import export
+
+ROOT = "http://site.test/"
+
+
+def _page(title, links=(), status=200):
+    return {
+        "status_code": status, "load_time": 0.5, "title": title, "meta_desc": "Missing",
+        "images": [{"src": ROOT + "a.png", "alt": ""}], "internal_links_count": len(links),
+        "found_links": list(links), "page_text": "text", "security_headers": {"hsts": True},
+    }
+
+
+@pytest.fixture
+def scan_id(temp_db):
+    crawl_id = temp_db.create_crawl(ROOT, max_pages=5)
+    temp_db.enqueue_urls(crawl_id, [ROOT + "about"], depth=1)
+    pages = {ROOT: _page("Home", [ROOT + "about"]), ROOT + "about": _page("Missing", status=404)}
+    for url, data in pages.items():
+        temp_db.claim_urls(crawl_id, "w1")
+        temp_db.complete_url(crawl_id, url, "w1", 0 if url == ROOT else 1, data)
+    return temp_db.save_scan(ROOT, 70, pages[ROOT], crawl_id=crawl_id)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_export_round_trip(scan_id, tmp_path, fmt):
+    export.export_scan(scan_id, tmp_path, fmt)
+
+    pages = export.read_scan_table("pages", scan_id, tmp_path, fmt)
+    assert sorted(pages["url"].to_pylist()) == [ROOT, ROOT + "about"]
+    assert export.read_scan_table("links", scan_id, tmp_path, fmt).to_pylist() == [
+        {"source": ROOT, "target": ROOT + "about"},
+    ]
+    assert export.open_dataset("scans", tmp_path, fmt).to_table()["scan_id"].to_pylist() == [scan_id]
+
+
+def test_parquet_and_arrow_exports_stay_apart(scan_id, tmp_path):
+    export.export_scan(scan_id, tmp_path, "parquet")
+    export.export_scan(scan_id, tmp_path, "arrow")
+
+    for fmt in export.FORMATS:
+        trends = export.scan_trends(ROOT, tmp_path, fmt).to_pylist()
+        assert len(trends) == 1
+        assert trends[0]["load_time_count"] == 2
+        assert trends[0]["missing_title_sum"] == 1
+        assert trends[0]["broken_sum"] == 1
+
+
+def test_export_all_skips_per_format(scan_id, tmp_path):
+    assert export.export_all(tmp_path, "parquet") == [scan_id]
+    assert export.export_all(tmp_path, "parquet") == []
+    assert export.export_all(tmp_path, "arrow") == [scan_id]
@@ -0,0 +1,153 @@
+import sqlite3
+import time
+
+ROOT = "http://site.test/"
+
+
+def _row(db, crawl_id, url):
+    conn = sqlite3.connect(db.DB_NAME)
+    row = conn.execute(
+        "SELECT status, attempts, lease_owner, not_before, last_error FROM frontier WHERE crawl_id=? AND url=?",
+        (crawl_id, url),
+    ).fetchone()
+    conn.close()
+    return dict(zip(("status", "attempts", "lease_owner", "not_before", "last_error"), row))
+
+
+def _expire_leases(db, crawl_id):
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.execute("UPDATE frontier SET lease_expires=? WHERE crawl_id=? AND status='leased'",
+                 (time.time() - 1, crawl_id))
+    conn.commit()
+    conn.close()
+
+
+def test_claim_leases_each_url_once(temp_db):
+    crawl_id = temp_db.create_crawl(ROOT, max_pages=10)
+    temp_db.enqueue_urls(crawl_id, [ROOT + "a", ROOT + "b"], depth=1)
+
+    first = temp_db.claim_urls(crawl_id, "w1", batch=2)
+    second = temp_db.claim_urls(crawl_id, "w2", batch=5)
+
+    assert [url for url, _ in first] == [ROOT, ROOT + "a"]
+    assert [url for url, _ in second] == [ROOT + "b"]
+    assert _row(temp_db, crawl_id, ROOT) == {
+        "status": "leased", "attempts": 1, "lease_owner": "w1", "not_before": None, "last_error": None,
+    }
+
+
+def test_enqueue_stops_at_page_budget(temp_db):
+    crawl_id = temp_db.create_crawl(ROOT, max_pages=3)
+    added = temp_db.enqueue_urls(crawl_id, [ROOT + p for p in "abcd"], depth=1)
+    assert added == 2
+    assert temp_db.enqueue_urls(crawl_id, [ROOT + "a"], depth=1) == 0
+
+
+def test_renew_lease_only_for_owner(temp_db):
+    crawl_id = temp_db.create_crawl(ROOT)
+    temp_db.claim_urls(crawl_id, "w1")
+    assert temp_db.renew_lease(crawl_id, ROOT, "w1")
+    assert not temp_db.renew_lease(crawl_id, ROOT, "w2")
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_loses_it(temp_db):
+    crawl_id = temp_db.create_crawl(ROOT)
+    temp_db.claim_urls(crawl_id, "w1")
+    _expire_leases(temp_db, crawl_id)
+
+    assert temp_db.claim_urls(crawl_id, "w2") == [(ROOT, 0)]
+    assert _row(temp_db, crawl_id, ROOT)["attempts"] == 2
+    assert not temp_db.renew_lease(crawl_id, ROOT, "w1")
+    assert not temp_db.complete_url(crawl_id, ROOT, "w1", 0, {"title": "stale"})
+    assert temp_db.complete_url(crawl_id, ROOT, "w2", 0, {"title": "T"})
+    assert temp_db.get_crawl_page(crawl_id, ROOT) == {"title": "T"}
+
+
+def test_expired_lease_fails_after_max_attempts(temp_db):
+    crawl_id = temp_db.create_crawl(ROOT)
+    for attempt in range(temp_db.MAX_ATTEMPTS):
+        assert temp_db.claim_urls(crawl_id, f"w{attempt}") == [(ROOT, 0)]
+        _expire_leases(temp_db, crawl_id)
+
+    assert temp_db.claim_urls(crawl_id, "last") == []
+    state = temp_db.get_url_state(crawl_id, ROOT)
+    assert state["status"] == "failed"
+    assert state["attempts"] == temp_db.MAX_ATTEMPTS
+    assert state["last_error"]
+
+
+def test_fail_url_backs_off_and_keeps_error(temp_db):
+    crawl_id = temp_db.create_crawl(ROOT)
+    temp_db.claim_urls(crawl_id, "w1")
+    before = time.time()
+    temp_db.fail_url(crawl_id, ROOT, "w1", error="timed out", retry_delay=60)
+
+    row = _row(temp_db, crawl_id, ROOT)
+    assert row["status"] == "pending"
+    assert row["lease_owner"] is None
+    assert row["not_before"] >= before + 60
+    assert row["last_error"] == "timed out"
+    # Not claimable until the back-off is over
+    assert temp_db.claim_urls(crawl_id, "w2") == []
+
+
+def test_fail_url_gives_up_after_crawl_max_attempts(temp_db):
+    crawl_id = temp_db.create_crawl(ROOT, max_attempts=2)
+    for worker in ("w1", "w2"):
+        assert temp_db.claim_urls(crawl_id, worker) == [(ROOT, 0)]
+        temp_db.fail_url(crawl_id, ROOT, worker, error="boom", retry_delay=0)
+
+    assert temp_db.get_url_state(crawl_id, ROOT) == {"status": "failed", "attempts": 2, "last_error": "boom"}
+    assert temp_db.get_crawl_progress(crawl_id)["failed"] == 1
+
+
+def test_fail_url_ignores_workers_without_the_lease(temp_db):
+    crawl_id = temp_db.create_crawl(ROOT)
+    temp_db.claim_urls(crawl_id, "w1")
+    temp_db.fail_url(crawl_id, ROOT, "w2", error="not mine")
+    assert _row(temp_db, crawl_id, ROOT)["status"] == "leased"
+
+
+def test_requeue_does_not_use_up_an_attempt(temp_db):
+    crawl_id = temp_db.create_crawl(ROOT)
+    not_before = time.time() + 60
+    for _ in range(temp_db.MAX_ATTEMPTS + 2):
+        # Make the URL claimable again, as if the back-off had passed
+        conn = sqlite3.connect(temp_db.DB_NAME)
+        conn.execute("UPDATE frontier SET not_before=NULL")
+        conn.commit()
+        conn.close()
+        assert temp_db.claim_urls(crawl_id, "w1") == [(ROOT, 0)]
+        temp_db.requeue_url(crawl_id, ROOT, "w1", not_before=not_before)
+
+    row = _row(temp_db, crawl_id, ROOT)
+    assert row["status"] == "pending"
+    assert row["attempts"] == 0
+    assert row["not_before"] == not_before
+    assert temp_db.claim_urls(crawl_id, "w2") == []
+
+
+def test_release_worker_hands_back_only_its_own_leases(temp_db):
+    crawl_id = temp_db.create_crawl(ROOT, max_pages=10)
+    temp_db.enqueue_urls(crawl_id, [ROOT + "a"], depth=1)
+    temp_db.claim_urls(crawl_id, "w1", batch=1)
+    temp_db.claim_urls(crawl_id, "w2", batch=1)
+
+    temp_db.release_worker(crawl_id, "w1")
+
+    assert _row(temp_db, crawl_id, ROOT) == {
+        "status": "pending", "attempts": 0, "lease_owner": None, "not_before": None, "last_error": None,
+    }
+    assert _row(temp_db, crawl_id, ROOT + "a")["lease_owner"] == "w2"
+    assert temp_db.get_crawl_progress(crawl_id) == {"pending": 1, "leased": 1, "done": 0, "failed": 0}
+
+
+def test_crawl_page_link_sample(temp_db):
+    crawl_id = temp_db.create_crawl(ROOT)
+    temp_db.claim_urls(crawl_id, "w1")
+    links = [f"{ROOT}p{i}" for i in range(100)]
+    temp_db.complete_url(crawl_id, ROOT, "w1", 0, {"found_links": links})
+
+    assert temp_db.get_crawl_page(crawl_id, ROOT)["found_links"] == links
+    sample = temp_db.get_crawl_page(crawl_id, ROOT, link_limit=temp_db.GRAPH_LINKS)["found_links"]
+    assert sample == links[:temp_db.GRAPH_LINKS]
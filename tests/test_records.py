@@ -0,0 +1,63 @@
+import json
+
+from records import PageStore, UrlTable
+
+PAGE = {
+    "status_code": 200,
+    "load_time": 0.42,
+    "title": "Home",
+    "meta_desc": "Missing",
+    "images": [{"src": "http://site.test/logo.png", "alt": "Logo"},
+               {"src": "data:image/gif;base64,R0lG", "alt": ""}],
+    "internal_links_count": 2,
+    "found_links": ["http://site.test/about", "http://site.test/contact"],
+    "page_text": "Welcome to the café – ünïcode text",
+    "security_headers": {"hsts": True, "x_frame": False, "x_content_type": True, "csp": False},
+}
+
+
+def test_page_view_round_trips_a_crawl_result():
+    store = PageStore()
+    store.append("http://site.test/", PAGE)
+    view = store[0]
+
+    assert view == PAGE
+    assert dict(view) == PAGE
+    assert view.to_dict() == PAGE
+    assert json.loads(json.dumps(dict(view))) == PAGE
+    assert view.url == "http://site.test/"
+    store.close()
+
+
+def test_failed_page_keeps_only_its_error():
+    store = PageStore()
+    store.append("http://site.test/down", {"error": "timed out"})
+    assert dict(store[-1]) == {"error": "timed out"}
+    store.close()
+
+
+def test_link_targets_are_shared_node_ids():
+    store = PageStore()
+    store.append("http://site.test/", PAGE)
+    store.append("http://site.test/about", dict(PAGE, found_links=["http://site.test/contact"]))
+
+    contact = store.intern_url("http://site.test/contact")
+    assert list(store.link_ids(1)) == [contact]
+    assert contact in store.link_ids(0)
+    assert store.node_url(contact) == "http://site.test/contact"
+    store.close()
+
+
+def test_url_table_keeps_urls_without_a_host_whole():
+    urls = UrlTable()
+    for url in ("http://a.test/x", "https://a.test/x", "/relative", "data:image/png;base64,AAAA", "http://a.test/x"):
+        assert urls.url(urls.intern(url)) == url
+    assert len(urls) == 4
+
+
+def test_save_scan_accepts_a_page_view(temp_db):
+    store = PageStore()
+    store.append("http://site.test/", PAGE)
+    scan_id = temp_db.save_scan("http://site.test/", 75, store[0])
+    store.close()
+    assert temp_db.get_scan_by_id(scan_id) == PAGE
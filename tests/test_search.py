@@ -0,0 +1,74 @@
+import json
+import sqlite3
+
+import pytest
+
+import database as db
+
+
+def _page(title, text="", meta="Missing"):
+    return {"title": title, "meta_desc": meta, "page_text": text, "found_links": []}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("seo audit", '"seo"* "audit"*'),
+    ("AND OR NOT", '"AND"* "OR"* "NOT"*'),
+    ('title:"x" -y (z*)', '"title"* "x"* "y"* "z"*'),
+    ("café", '"café"*'),
+    ("", None),
+    ('" - * ()', None),
+])
+def test_fts_query_quotes_every_word(text, expected):
+    assert db._fts_query(text) == expected
+
+
+def test_search_ranks_title_matches_first(temp_db):
+    body = temp_db.save_scan("http://a.test/", 70, _page("Home", text="we sell garden tools"))
+    title = temp_db.save_scan("http://b.test/", 80, _page("Garden tools"))
+
+    hits = temp_db.search_pages("garden")
+    assert [hit["scan_id"] for hit in hits] == [title, body]
+    assert temp_db.search_pages("gard")[0]["scan_id"] == title  # prefix match
+    assert temp_db.search_pages('NOT "') == []
+
+
+def test_search_covers_every_page_of_a_crawl(temp_db):
+    crawl_id = temp_db.create_crawl("http://c.test/", max_pages=5)
+    temp_db.enqueue_urls(crawl_id, ["http://c.test/pricing"], depth=1)
+    for url, title in (("http://c.test/", "Home"), ("http://c.test/pricing", "Pricing plans")):
+        temp_db.claim_urls(crawl_id, "w1")
+        temp_db.complete_url(crawl_id, url, "w1", 0, _page(title))
+    scan_id = temp_db.save_scan("http://c.test/", 90, _page("Home"), crawl_id=crawl_id)
+
+    hits = temp_db.search_pages("pricing")
+    assert [(hit["scan_id"], hit["url"]) for hit in hits] == [(scan_id, "http://c.test/pricing")]
+    assert temp_db.get_scan_page(scan_id, "http://c.test/pricing")["title"] == "Pricing plans"
+
+
+def test_init_db_builds_index_for_existing_scans(tmp_path, monkeypatch):
+    # A history file from before search existed: only the original scans table
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE scans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            score INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            full_data TEXT
+        )
+    ''')
+    conn.execute("INSERT INTO scans (url, score, full_data) VALUES (?, ?, ?)",
+                 ("http://old.test/", 60, json.dumps(_page("Vintage bicycles"))))
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(db, "DB_NAME", str(path))
+    db.init_db()
+    db.init_db()  # Second run must not rebuild or duplicate the index
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 2
+    assert conn.execute("SELECT COUNT(*) FROM pages_fts").fetchone()[0] == 1
+    conn.close()
+    assert [hit["url"] for hit in db.search_pages("bicycle")] == ["http://old.test/"]